@@ -4,15 +4,31 @@ import sys
 import csv
 import html
 import difflib
+from collections import deque
+from contextlib import ExitStack
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Iterable, Iterator, List, Tuple, Optional
 
 import fitz  # PyMuPDF
 from docx import Document
-from docx.shared import Inches, Pt
+from docx.shared import Emu, Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 
+try:
+    from rapidfuzz import fuzz, process  # optional: C++ matcher, much faster than difflib
+except ImportError:
+    process = None
+
+try:
+    import numpy  # noqa: F401 -- process.cdist returns a NumPy matrix
+except ImportError:
+    numpy = None
+
 
 # ========= USER CONFIG (can be overridden by command line args) =========
 PDF_ROOT = r"/path/to/your/root_folder"          # The main folder containing many subfolders, each with one PDF
@@ -25,25 +41,78 @@ MIN_W = 500
 MIN_H = 500
 MIN_AREA = 300_000
 
+# JPEG quality for saved figures
+JPG_QUALITY = 85
+
+# Largest size of a figure in the DOCX (fits a Letter page with margins)
+MAX_FIG_WIDTH = Inches(6.5)
+MAX_FIG_HEIGHT = Inches(9.0)
+
 # Fuzzy match threshold (0–1). Higher = stricter match.
 MATCH_THRESHOLD = 0.55
 
+# Text extraction flags: same as get_text("text"), so no image blocks are
+# decoded when the first page's "dict" is built for title detection
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT
+
+# Number of worker processes used to parse PDFs in parallel
+MAX_WORKERS = min(os.cpu_count() or 1, 6)
+
+
+# ========= PRECOMPILED PATTERNS =========
+_RE_HTML = re.compile(r"<[^>]+>")
+_RE_PUNCT = re.compile(r"[_\-–—:,.;/\\()\[\]{}<>|!?\"'`~^*+=]+")
+_RE_WS = re.compile(r"\s+")
+_RE_FIG_NORM = re.compile(r"\bFig\.\s*")
+# "Fig." at the very end of a page: its \s* may still extend into the next page
+_RE_FIG_TAIL = re.compile(r"\bFig\.\s*\Z")
+_CAPTION_START = r"Figure\s+[S]?\d+[A-Za-z]?(?:\.[A-Za-z])?\s*[\.:]"
+_CAPTION_END = r"\nFigure\s+[S]?\d+|\nSTAR★METHODS|\nREFERENCES|\nArticle"
+_RE_CAPTION = re.compile(rf"({_CAPTION_START}.*?)(?=(?:{_CAPTION_END})|\Z)", flags=re.DOTALL)
+_RE_CAPTION_START = re.compile(_CAPTION_START)
+_RE_CAPTION_END = re.compile(_CAPTION_END)
+# A caption head cut off at the end of a page ("Figure", "Figure S2", ...)
+_RE_OPEN_HEAD = re.compile(r"Figure(?:\s+S?\d*[A-Za-z]?(?:\.[A-Za-z]?)?)?\s*\Z")
+_RE_CAPTION_HEAD = re.compile(r"^(Figure\s+[S]?\d+[A-Za-z]?(?:\.[A-Za-z])?)\s*([\.:].*)$", flags=re.DOTALL)
+# Trailing spaces before a newline, or a run of (blank) lines: see _clean_caption
+_RE_CAP_CLEAN = re.compile(r"[ \t]+\n(?:[ \t]*\n)*|\n(?:[ \t]*\n)+")
+_RE_RUN_BREAKS = re.compile(r"([\n\r\t])")
+
 
 # ========= HELPER FUNCTIONS =========
 def strip_html_tags(s: str) -> str:
     """Remove basic HTML tags and decode entities like &amp;"""
-    s = re.sub(r"<[^>]+>", "", s)
+    s = _RE_HTML.sub("", s)
     return html.unescape(s).strip()
 
 
 def normalize_for_match(s: str) -> str:
     """Normalize text for fuzzy comparison."""
     s = s.lower()
-    s = re.sub(r"[_\-–—:,.;/\\()\[\]{}<>|!?\"'`~^*+=]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _RE_PUNCT.sub(" ", s)
+    s = _RE_WS.sub(" ", s).strip()
     return s
 
 
+def find_pdfs(root: str) -> Iterator[Path]:
+    """Yield every PDF under `root` (recursive, case-insensitive suffix).
+
+    Uses os.scandir directly: directory entries already know whether they are
+    files or folders, so no extra stat call is made per entry.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                        yield Path(entry.path)
+        except OSError:  # unreadable folder, or a root that is missing / not a folder
+            continue
+
+
 def read_citations(txt_path: str) -> List[str]:
     """Read all citation lines from the text file."""
     out = []
@@ -55,41 +124,103 @@ def read_citations(txt_path: str) -> List[str]:
     return out
 
 
-def best_fuzzy_match(target: str, pool: List[str], threshold: float) -> Tuple[str, float]:
-    """Find the best fuzzy match of `target` in `pool`."""
+def best_fuzzy_match(target: str, pool: List[str], pool_norm: List[str],
+                     threshold: float) -> Tuple[str, float]:
+    """Find the best fuzzy match of `target` in `pool`.
+
+    `pool_norm` holds `normalize_for_match()` of each entry in `pool`, computed
+    once by the caller instead of once per target.
+    """
     if not target:
         return "", 0.0
     target_n = normalize_for_match(target)
+    if process is not None:
+        match = process.extractOne(
+            target_n, pool_norm, scorer=fuzz.ratio, processor=None,
+            score_cutoff=threshold * 100,
+        )
+        return (pool[match[2]], match[1] / 100) if match else ("", 0.0)
+
+    # Same early-out as difflib.get_close_matches: the cheap upper bounds skip
+    # candidates that cannot reach the threshold or beat the current best.
+    sm = difflib.SequenceMatcher(None)
+    sm.set_seq1(target_n)
     best, best_score = "", 0.0
-    for cand in pool:
-        score = difflib.SequenceMatcher(None, target_n, normalize_for_match(cand)).ratio()
+    for cand, cand_n in zip(pool, pool_norm):
+        sm.set_seq2(cand_n)
+        cutoff = max(threshold, best_score)
+        if sm.real_quick_ratio() < cutoff or sm.quick_ratio() < cutoff:
+            continue
+        score = sm.ratio()
         if score > best_score:
             best, best_score = cand, score
     return (best, best_score) if best_score >= threshold else ("", 0.0)
 
 
-def extract_pdf_title(doc: fitz.Document) -> Optional[str]:
+def match_titles(titles: List[str], pool: List[str], pool_norm: List[str],
+                 threshold: float) -> List[Tuple[str, float]]:
+    """Find the best fuzzy match in `pool` for every title in `titles` at once.
+
+    With RapidFuzz and NumPy the whole titles x citations score matrix is
+    computed in a single multi-threaded `cdist` call; otherwise (or for a single
+    title) falls back to `best_fuzzy_match` per title.
+    """
+    if process is None or numpy is None or not pool or len(titles) < 2:
+        return [best_fuzzy_match(t, pool, pool_norm, threshold) for t in titles]
+    titles_n = [normalize_for_match(t) for t in titles]
+    scores = process.cdist(titles_n, pool_norm, scorer=fuzz.ratio, processor=None,
+                           score_cutoff=threshold * 100, workers=-1)
+    out = []
+    for title, row, j in zip(titles, scores, scores.argmax(axis=1)):
+        score = float(row[j])
+        if title and score > 0:
+            out.append((pool[j], score / 100))
+        else:
+            out.append(("", 0.0))
+    return out
+
+
+def walk_document(doc: fitz.Document) -> Tuple[List[str], dict, List[Tuple[int, list]]]:
+    """Walk all pages once and collect (captions, first-page text dict, images per page).
+
+    Each page's content stream is parsed into a single TextPage that serves both
+    the plain-text and the "dict" extraction. Text is kept in content-stream
+    order (sort=False): caption and title detection don't need reading order.
+    Captions are scanned page by page: only a caption still open at the end of a
+    page is kept, though one with no end marker can run to the end of the document.
+    """
+    first_page, image_records = {}, []
+
+    def page_texts() -> Iterator[str]:
+        for pi, page in enumerate(doc, start=1):
+            tp = page.get_textpage(flags=TEXT_FLAGS)
+            if pi == 1:
+                first_page.update(page.get_text("dict", textpage=tp, sort=False))
+            image_records.append((pi, page.get_images(full=True)))
+            yield page.get_text("text", textpage=tp, sort=False)
+
+    captions = extract_captions(page_texts())
+    return captions, first_page, image_records
+
+
+def extract_pdf_title(doc: fitz.Document, first_page: Optional[dict] = None) -> Optional[str]:
     """Extract title from metadata or first-page largest text spans."""
     meta_title = (doc.metadata or {}).get("title") or ""
     if meta_title.strip():
         return meta_title.strip()
 
     try:
-        page = doc[0]
-        raw = page.get_text("dict")
-        spans = []
-        for block in raw.get("blocks", []):
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    txt = span.get("text", "").strip()
-                    size = float(span.get("size", 0) or 0)
-                    if txt:
-                        spans.append((size, txt))
-        if spans:
-            spans.sort(key=lambda x: x[0], reverse=True)
-            top_size = spans[0][0]
-            pieces = [t for s, t in spans if abs(s - top_size) < 0.2]
-            candidate = re.sub(r"\s+", " ", " ".join(pieces)).strip()
+        raw = first_page if first_page is not None else doc[0].get_text("dict", flags=TEXT_FLAGS, sort=False)
+        spans = [
+            (float(span.get("size", 0) or 0), span.get("text", "").strip())
+            for block in raw.get("blocks", [])
+            for line in block.get("lines", [])
+            for span in line.get("spans", [])
+        ]
+        top_size = max((size for size, txt in spans if txt), default=None)
+        if top_size is not None:
+            pieces = [txt for size, txt in spans if txt and abs(size - top_size) < 0.2]
+            candidate = _RE_WS.sub(" ", " ".join(pieces)).strip()
             bad_starts = (
                 "Graphical abstract", "Highlights", "Article", "OPEN ACCESS",
                 "Summary", "In brief", "STAR★METHODS", "REFERENCES"
@@ -101,67 +232,260 @@ def extract_pdf_title(doc: fitz.Document) -> Optional[str]:
     return None
 
 
-def extract_full_text(doc: fitz.Document) -> str:
-    """Concatenate plain text from all pages."""
-    return "\n".join(page.get_text("text") for page in doc)
-
-
-def extract_captions(full_text: str) -> List[str]:
+def iter_captions(page_texts: Iterable[str]) -> Iterator[str]:
+    """Yield raw captions from page texts, one page at a time.
+
+    A caption (or caption head) that runs into the end of a page may continue on
+    the next one, so it is carried over instead of being yielded early. Pages are
+    joined with a newline, as when the whole text was scanned at once. A page
+    ending in "Fig." keeps that tail un-normalized until the next page is joined,
+    so "Fig.\n3." across a page break still becomes "Figure 3.".
+
+    Only each new page is normalized and scanned: an open caption is kept as a
+    list of pieces plus a short unsearched tail, and the search for its end
+    resumes where the previous page left off, so a caption running over many
+    pages costs linear, not quadratic, time.
+    """
+    carry, held = "", ""  # carry: a caption head cut off at the page end
+    parts, tail = [], ""  # an open caption: searched pieces + unsearched tail
+    for text in page_texts:
+        raw = held + "\n" + text if carry or held or parts else text
+        held = ""
+        fig_tail = _RE_FIG_TAIL.search(raw)
+        if fig_tail:
+            raw, held = raw[:fig_tail.start()], raw[fig_tail.start():]
+        pos = 0
+        if parts:
+            chunk = tail + _RE_FIG_NORM.sub("Figure ", raw)
+            end = _RE_CAPTION_END.search(chunk)
+            if end is None:
+                resume = _caption_end_resume(chunk, 0)
+                parts.append(chunk[:resume])
+                tail = chunk[resume:]
+                continue
+            yield "".join(parts) + chunk[:end.start()]
+            parts, tail, pos = [], "", end.start()
+        else:
+            chunk = carry + _RE_FIG_NORM.sub("Figure ", raw)
+        carry, last_end = "", pos
+        for m in _RE_CAPTION.finditer(chunk, pos):
+            if m.end() == len(chunk):
+                cap = chunk[m.start():]
+                resume = _caption_end_resume(cap, _RE_CAPTION_START.match(cap).end())
+                parts, tail = [cap[:resume]], cap[resume:]
+                break
+            last_end = m.end()
+            yield m.group(1)
+        else:
+            head = _RE_OPEN_HEAD.search(chunk, last_end)
+            if head:
+                carry = chunk[head.start():]
+    rest = _RE_FIG_NORM.sub("Figure ", held)
+    if parts:
+        yield "".join(parts) + tail + rest
+    else:
+        for m in _RE_CAPTION.finditer(carry + rest):
+            yield m.group(1)
+
+
+def _caption_end_resume(text: str, start: int) -> int:
+    """Return the first index >= `start` where a caption end could still begin
+    once more text is appended to `text` (e.g. a cut-off "\nREFER" or "\nFigure ")."""
+    pos = len(text) - len("\nSTAR★METHODS") + 1
+    base = text[:-1] if text.endswith("S") else text
+    stripped = base.rstrip()
+    if stripped.endswith("\nFigure") and (base is text or len(stripped) < len(base)):
+        pos = min(pos, len(stripped) - len("\nFigure"))
+    return max(start, pos)
+
+
+def _clean_caption(cap: str) -> str:
+    """Drop trailing spaces on each line and squeeze 3+ newlines to a blank line, in one pass."""
+    return _RE_CAP_CLEAN.sub(lambda m: "\n\n" if m.group().count("\n") > 1 else "\n", cap.strip())
+
+
+def extract_captions(page_texts: Iterable[str]) -> List[str]:
     """Extract captions starting with 'Figure' or 'Fig.' across pages."""
-    normalized = re.sub(r"\bFig\.\s*", "Figure ", full_text)
-    pattern = re.compile(
-        r"(Figure\s+[S]?\d+[A-Za-z]?(?:\.[A-Za-z])?\s*[\.:].*?)"
-        r"(?=(?:\nFigure\s+[S]?\d+)|\nSTAR★METHODS|\nREFERENCES|\nArticle|\Z)",
-        flags=re.DOTALL,
-    )
-    out = []
-    for m in pattern.finditer(normalized):
-        cap = m.group(1).strip()
-        cap = re.sub(r"[ \t]+\n", "\n", cap)
-        cap = re.sub(r"\n{3,}", "\n\n", cap)
-        out.append(cap)
-    return out
+    return [_clean_caption(cap) for cap in iter_captions(page_texts)]
+
 
+def extract_images(doc: fitz.Document, out_dir: Path, image_records: List[Tuple[int, list]],
+                   min_w: int, min_h: int, min_area: int,
+                   jpg_quality: int) -> List[Tuple[Path, int, int]]:
+    """Save all large images (skip small icons) listed in `image_records`.
 
-def extract_images(doc: fitz.Document, out_dir: Path) -> List[Path]:
-    """Extract all large images (skip small icons) and return file paths."""
+    Images below `min_w` x `min_h` pixels or `min_area` total are skipped.
+    Returns (file path, width px, height px) for each saved image.
+    """
     out_dir.mkdir(parents=True, exist_ok=True)
     paths = []
-    for pi, page in enumerate(doc, start=1):
-        for ii, img in enumerate(page.get_images(full=True), start=1):
-            xref = img[0]
+    seen = set()  # the same xref (logo, banner) often appears on every page
+    for pi, page_images in image_records:
+        for ii, img in enumerate(page_images, start=1):
+            # get_images(full=True) entries carry the image's pixel size, so
+            # small icons are skipped before any pixel data is decoded.
+            xref, w, h = img[0], img[2], img[3]
+            if xref in seen:
+                continue
+            seen.add(xref)
+            if w < min_w or h < min_h or w * h < min_area:
+                continue
             try:
                 pix = fitz.Pixmap(doc, xref)
-                if pix.colorspace and pix.colorspace.n == 4:
+                if pix.alpha:
+                    pix = fitz.Pixmap(pix, 0)  # JPEG has no alpha channel
+                # Gray and RGB are saved as-is; CMYK JPEGs (Adobe marker, no JFIF)
+                # are rejected by python-docx, so those and anything else go to RGB
+                if pix.colorspace and pix.colorspace.n not in (1, 3):
                     pix = fitz.Pixmap(fitz.csRGB, pix)
-                w, h, area = pix.width, pix.height, pix.width * pix.height
-                if w >= MIN_W and h >= MIN_H and area >= MIN_AREA:
-                    fn = f"p{pi:02d}_img{ii:02d}.png"
-                    p = out_dir / fn
-                    pix.save(p.as_posix())
-                    paths.append(p)
+                fn = f"p{pi:02d}_img{ii:02d}.jpg"
+                p = out_dir / fn
+                pix.save(p.as_posix(), jpg_quality=jpg_quality)
+                paths.append((p, w, h))
             except Exception:
                 continue
     return paths
 
 
+# <w:rPr> templates keyed by (bold, italic), copied into each new run
+_RPR_TEMPLATES = {}
+
+
+def _run_props(bold: bool, italic: bool):
+    """Return a fresh <w:rPr> element for the given run style."""
+    key = (bold, italic)
+    if key not in _RPR_TEMPLATES:
+        rpr = OxmlElement("w:rPr")
+        if bold:
+            rpr.append(OxmlElement("w:b"))
+        if italic:
+            rpr.append(OxmlElement("w:i"))
+        _RPR_TEMPLATES[key] = rpr
+    return deepcopy(_RPR_TEMPLATES[key])
+
+
+def fast_paragraph(doc: Document, runs: List[Tuple[str, bool, bool]]):
+    """Append a paragraph made of (text, bold, italic) runs by building its XML directly.
+
+    Same result as doc.add_paragraph() plus one add_run() per run ("\\n" and "\\r"
+    become <w:br/>, "\\t" becomes <w:tab/>), without python-docx's per-call overhead.
+    """
+    p = OxmlElement("w:p")
+    for text, bold, italic in runs:
+        r = OxmlElement("w:r")
+        if bold or italic:
+            r.append(_run_props(bold, italic))
+        for piece in _RE_RUN_BREAKS.split(text):
+            if piece in ("\n", "\r"):
+                r.append(OxmlElement("w:br"))
+            elif piece == "\t":
+                r.append(OxmlElement("w:tab"))
+            elif piece:
+                t = OxmlElement("w:t")
+                t.set(qn("xml:space"), "preserve")
+                t.text = piece
+                r.append(t)
+        p.append(r)
+    # Paragraphs must precede the body's trailing <w:sectPr>
+    body = doc.element.body
+    if body.sectPr is not None:
+        body.sectPr.addprevious(p)
+    else:
+        body.append(p)
+
+
 def write_citation(doc: Document, name: str, matched: bool):
     """Insert the citation name before each figure/caption pair."""
-    run = doc.add_paragraph().add_run(name if name else "[No citation matched]")
-    run.bold = True
+    runs = [(name if name else "[No citation matched]", True, False)]
     if not matched:
-        doc.paragraphs[-1].add_run("  [UNMATCHED]").italic = True
+        runs.append(("  [UNMATCHED]", False, True))
+    fast_paragraph(doc, runs)
+
+
+def process_one_pdf(pdf_path: Path, img_dir: Path, min_w: int, min_h: int,
+                    min_area: int, jpg_quality: int) -> dict:
+    """Parse one PDF: detect its title, extract captions and save large images.
+
+    Runs in a worker process, so everything returned must be picklable. Image
+    settings are passed in rather than read from the module globals, which a
+    spawned worker re-imports with their default values.
+    """
+    pdf = fitz.open(pdf_path.as_posix())
+    try:
+        captions, first_page, image_records = walk_document(pdf)
+        detected_title = extract_pdf_title(pdf, first_page) or ""
+        images = extract_images(pdf, img_dir, image_records,
+                                min_w, min_h, min_area, jpg_quality)
+    finally:
+        pdf.close()
+    return {
+        "pdf_path": pdf_path,
+        "title": detected_title,
+        "captions": captions,
+        "images": images,
+    }
+
+
+def write_pdf_result_to_docx(doc: Document, idx: int, result: dict):
+    """Write one parsed PDF (figures, captions, citation) into the DOCX."""
+    pdf_path = result["pdf_path"]
+    detected_title = result["title"]
+    captions = result["captions"]
+    images = result["images"]
+    best_cit, score = result["citation"], result["score"]
+    matched = bool(best_cit)
+    citation_name = best_cit if matched else pdf_path.stem
+
+    if idx > 1:
+        doc.add_page_break()
+    doc.add_heading(f"[{idx}] {pdf_path.name}", level=2)
+
+    pairs = max(len(images), len(captions))
+    if pairs == 0:
+        write_citation(doc, citation_name, matched)
+        doc.add_paragraph("[No large figures or captions detected.]")
+    else:
+        for i in range(pairs):
+            write_citation(doc, citation_name, matched)
+
+            # Add image
+            if i < len(images):
+                img_path, w, h = images[i]
+                # Fit the page width, or the page height for tall figures
+                width = Emu(min(MAX_FIG_WIDTH, MAX_FIG_HEIGHT * w // max(h, 1)))
+                try:
+                    doc.add_picture(img_path.as_posix(), width=width)
+                    doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+                except Exception:
+                    doc.add_paragraph(f"[Image failed: {img_path.name}]")
+            else:
+                doc.add_paragraph("[Image not found for this caption]")
+
+            # Add caption
+            if i < len(captions):
+                m = _RE_CAPTION_HEAD.match(captions[i])
+                if m:
+                    fast_paragraph(doc, [(m.group(1), True, False), (m.group(2), False, False)])
+                else:
+                    fast_paragraph(doc, [(captions[i], False, False)])
+            else:
+                doc.add_paragraph("[Caption not detected for the above image]")
+
+    # Optional info
+    info = f"Title detected: {detected_title or 'N/A'} | Citation: {(best_cit or 'N/A')} (score={score:.2f})"
+    doc.add_paragraph(info).italic = True
 
 
 # ========= MAIN PIPELINE =========
 def main(pdf_root: str, citations_txt: str, output_docx: str, output_csv: Optional[str] = None):
     # Recursively find all PDFs under the root directory
-    pdf_files = sorted(Path(pdf_root).rglob("*.pdf"))
+    pdf_files = sorted(find_pdfs(pdf_root))
     if not pdf_files:
         print("No PDFs found under:", pdf_root)
         return
 
     citations = read_citations(citations_txt)
+    citations_norm = [normalize_for_match(c) for c in citations]
 
     # Prepare Word document
     doc = Document()
@@ -174,83 +498,57 @@ def main(pdf_root: str, citations_txt: str, output_docx: str, output_csv: Option
         "and each pair is preceded by its matched citation name."
     )
 
-    # Optional mapping table
-    mapping_rows = [("pdf_path", "pdf_title_detected", "matched_citation", "score")]
     images_root = Path(output_docx).parent / f"_images_{Path(output_docx).stem}"
 
-    for idx, pdf_path in enumerate(pdf_files, start=1):
-        pdf = fitz.open(pdf_path.as_posix())
-
-        # --- Detect title and match to citation ---
-        detected_title = extract_pdf_title(pdf) or ""
-        best_cit, score = best_fuzzy_match(detected_title, citations, MATCH_THRESHOLD)
-        matched = bool(best_cit)
-        citation_name = best_cit if matched else pdf_path.stem
-        mapping_rows.append((str(pdf_path), detected_title or "N/A", best_cit or "N/A", f"{score:.2f}"))
-
-        # --- Extract captions and images ---
-        full_text = extract_full_text(pdf)
-        captions = extract_captions(full_text)
-        img_dir = images_root / pdf_path.stem
-        images = extract_images(pdf, img_dir)
-
-        # --- Write into DOCX ---
-        if idx > 1:
-            doc.add_page_break()
-        doc.add_heading(f"[{idx}] {pdf_path.name}", level=2)
-
-        pairs = max(len(images), len(captions))
-        if pairs == 0:
-            write_citation(doc, citation_name, matched)
-            doc.add_paragraph("[No large figures or captions detected.]")
-        else:
-            for i in range(pairs):
-                write_citation(doc, citation_name, matched)
-
-                # Add image
-                if i < len(images):
-                    try:
-                        p = doc.add_picture(images[i].as_posix(), width=Inches(6.5))
-                        doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    except Exception:
-                        try:
-                            p = doc.add_picture(images[i].as_posix(), width=Inches(5.5))
-                            doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
-                        except Exception:
-                            doc.add_paragraph(f"[Image failed: {images[i].name}]")
-                else:
-                    doc.add_paragraph("[Image not found for this caption]")
-
-                # Add caption
-                if i < len(captions):
-                    para = doc.add_paragraph()
-                    m = re.match(r"^(Figure\s+[S]?\d+[A-Za-z]?(?:\.[A-Za-z])?)\s*([\.:].*)$",
-                                 captions[i], flags=re.DOTALL)
-                    if m:
-                        r1 = para.add_run(m.group(1)); r1.bold = True
-                        para.add_run(m.group(2))
-                    else:
-                        para.add_run(captions[i])
-                else:
-                    doc.add_paragraph("[Caption not detected for the above image]")
-
-        # Optional info
-        info = f"Title detected: {detected_title or 'N/A'} | Citation: {(best_cit or 'N/A')} (score={score:.2f})"
-        doc.add_paragraph(info).italic = True
-
-        pdf.close()
-
-    # --- Save Word document ---
-    Path(output_docx).parent.mkdir(parents=True, exist_ok=True)
-    doc.save(output_docx)
-    print("Saved DOCX:", output_docx)
+    # Each PDF gets its own image folder; the index prefix keeps PDFs with the
+    # same file name from overwriting each other's images while running in parallel.
+    img_dirs = [images_root / f"{i:03d}_{p.stem}" for i, p in enumerate(pdf_files, start=1)]
+
+    with ExitStack() as stack:
+        # Optional mapping table, streamed row by row so a crash keeps what was done
+        csv_file = csv_writer = None
+        if output_csv:
+            Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
+            csv_file = stack.enter_context(open(output_csv, "w", newline="", encoding="utf-8"))
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(("pdf_path", "pdf_title_detected", "matched_citation", "score"))
+
+        # Parse PDFs in worker processes while the main process matches titles and
+        # writes the DOCX (python-docx is not thread-safe). At most 2 * MAX_WORKERS
+        # results are in flight at once, and they are consumed in submission order.
+        jobs = ((pdf_path, img_dir, MIN_W, MIN_H, MIN_AREA, JPG_QUALITY)
+                for pdf_path, img_dir in zip(pdf_files, img_dirs))
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pending = deque(executor.submit(process_one_pdf, *job)
+                            for job in islice(jobs, 2 * MAX_WORKERS))
+            idx = 0
+            while pending:
+                # Wait for the next result in order, then take every result
+                # queued behind it that is already done and match them together
+                batch = [pending.popleft().result()]
+                while pending and pending[0].done():
+                    batch.append(pending.popleft().result())
+                for job in islice(jobs, len(batch)):
+                    pending.append(executor.submit(process_one_pdf, *job))
+
+                matches = match_titles([r["title"] for r in batch], citations, citations_norm,
+                                       MATCH_THRESHOLD)
+                for result, (best_cit, score) in zip(batch, matches):
+                    idx += 1
+                    result["citation"], result["score"] = best_cit, score
+                    if csv_writer:
+                        csv_writer.writerow((str(result["pdf_path"]), result["title"] or "N/A",
+                                             best_cit or "N/A", f"{score:.2f}"))
+                    write_pdf_result_to_docx(doc, idx, result)
+                if csv_file:
+                    csv_file.flush()
+
+        # --- Save Word document ---
+        Path(output_docx).parent.mkdir(parents=True, exist_ok=True)
+        doc.save(output_docx)
+        print("Saved DOCX:", output_docx)
 
-    # --- Save mapping CSV ---
     if output_csv:
-        Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
-        with open(output_csv, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerows(mapping_rows)
         print("Saved mapping CSV:", output_csv)
 
 